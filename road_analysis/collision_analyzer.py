@@ -4,9 +4,79 @@ Collision Analyzer Module
 Analyzes collision data and calculates statistics.
 """
 
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from typing import Dict, List, Tuple
+import shapely
+from scipy.spatial import cKDTree
+from shapely.geometry import box
+from typing import Dict, List, Tuple, Optional
+
+try:
+    import numba
+except ImportError:  # Optional: fall back to Shapely distances
+    numba = None
+
+from .utils import transform_geometry, transform_xy
+
+
+@lru_cache(maxsize=None)
+def _estimate_utm_crs(bounds_bytes: bytes, crs):
+    """
+    Estimate the UTM CRS for a bounding box, cached by its raw bytes.
+    
+    Args:
+        bounds_bytes: total_bounds array as bytes (float64)
+        crs: CRS the bounds are expressed in
+        
+    Returns:
+        Estimated UTM CRS
+    """
+    bounds = np.frombuffer(bounds_bytes, dtype=np.float64)
+    return gpd.GeoSeries([box(*bounds)], crs=crs).estimate_utm_crs()
+
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _point_polyline_distance(pts, verts):
+        """
+        Minimum distance from each point to a polyline.
+        
+        Args:
+            pts: (N, 2) array of point coordinates
+            verts: (K, 2) array of polyline vertices
+            
+        Returns:
+            (N,) array of distances
+        """
+        n = pts.shape[0]
+        out = np.empty(n, dtype=np.float64)
+        for i in numba.prange(n):
+            px = pts[i, 0]
+            py = pts[i, 1]
+            best = np.inf
+            for j in range(verts.shape[0] - 1):
+                ax = verts[j, 0]
+                ay = verts[j, 1]
+                dx = verts[j + 1, 0] - ax
+                dy = verts[j + 1, 1] - ay
+                seg_len_sq = dx * dx + dy * dy
+                t = 0.0
+                if seg_len_sq > 0.0:
+                    t = ((px - ax) * dx + (py - ay) * dy) / seg_len_sq
+                    t = min(max(t, 0.0), 1.0)
+                ex = ax + t * dx - px
+                ey = ay + t * dy - py
+                d_sq = ex * ex + ey * ey
+                if d_sq < best:
+                    best = d_sq
+            out[i] = np.sqrt(best)
+        return out
+else:
+    _point_polyline_distance = None
 
 
 class CollisionAnalyzer:
@@ -18,6 +88,7 @@ class CollisionAnalyzer:
         sample_points (gpd.GeoDataFrame): Road sample points
         radius (float): Search radius in meters
         nearby_collisions (gpd.GeoDataFrame): Filtered collisions within radius
+        search_area (Polygon): Union of radius buffers around sample points
     """
     
     # Mapping dictionaries
@@ -50,7 +121,8 @@ class CollisionAnalyzer:
     def __init__(self, collisions_gdf: gpd.GeoDataFrame, 
                  sample_points: gpd.GeoDataFrame,
                  road_line,
-                 radius: float = 50):
+                 radius: float = 50,
+                 utm_crs: Optional[object] = None):
         """
         Initialize CollisionAnalyzer.
         
@@ -59,13 +131,27 @@ class CollisionAnalyzer:
             sample_points: GeoDataFrame containing road sample points
             road_line: Road line geometry for distance calculation
             radius: Search radius in meters
+            utm_crs: Projected UTM CRS to use (e.g. the sampler's
+                road_projected_gdf.crs); estimated from sample points if None
         """
         self.collisions_gdf = collisions_gdf
         self.sample_points = sample_points
         self.road_line = road_line
         self.radius = radius
         self.nearby_collisions = None
+        self.search_area = None
         self.statistics = {}
+        
+        if utm_crs is None:
+            utm_crs = _estimate_utm_crs(
+                self.sample_points.total_bounds.tobytes(),
+                self.sample_points.crs
+            )
+        self._utm_crs = utm_crs
+        self._collisions_xy = None
+        self._collisions_xy_key = None
+        self._xy_origin = None
+        self._export_order = None
     
     def find_nearby_collisions(self) -> gpd.GeoDataFrame:
         """
@@ -74,37 +160,71 @@ class CollisionAnalyzer:
         Returns:
             GeoDataFrame containing nearby collisions
         """
-        # Get UTM CRS from sample points
-        utm_crs = self.sample_points.estimate_utm_crs()
-        
-        # Project data
-        collisions_projected = self.collisions_gdf.to_crs(utm_crs)
-        sample_points_projected = self.sample_points.to_crs(utm_crs)
-        road_projected_gdf = gpd.GeoDataFrame(
-            geometry=[self.road_line], 
-            crs=self.sample_points.crs
-        ).to_crs(utm_crs)
-        road_projected = road_projected_gdf.geometry.iloc[0]
-        
-        # Find collisions within radius
-        nearby_indices = set()
-        
-        for _, sample_point in sample_points_projected.iterrows():
-            distances = collisions_projected.geometry.distance(sample_point.geometry)
-            within_radius = distances[distances <= self.radius].index
-            nearby_indices.update(within_radius)
-        
-        # Get unique collisions
-        self.nearby_collisions = self.collisions_gdf.loc[list(nearby_indices)].copy()
-        
-        # Calculate distance from each collision to road
-        nearby_collisions_proj = self.nearby_collisions.to_crs(utm_crs)
-        distances_to_road = []
-        
-        for _, collision in nearby_collisions_proj.iterrows():
-            dist = collision.geometry.distance(road_projected)
-            distances_to_road.append(dist)
-        
+        utm_crs = self._utm_crs
+        
+        samp_xy = transform_xy(
+            self.sample_points.geometry.x.values,
+            self.sample_points.geometry.y.values,
+            self.sample_points.crs, utm_crs
+        )
+        road_projected = transform_geometry(
+            self.road_line, self.sample_points.crs, utm_crs
+        )
+        
+        # Project collisions once per frame and CRS, stored as float32 offsets
+        # from a local origin (float32 keeps sub-millimetre precision near the road)
+        cache_key = self._collisions_xy_key
+        if (cache_key is None or cache_key[0] is not self.collisions_gdf
+                or cache_key[1] != utm_crs):
+            self._collisions_xy_key = (self.collisions_gdf, utm_crs)
+            self._xy_origin = samp_xy.min(axis=0)
+            self._collisions_xy = (transform_xy(
+                self.collisions_gdf.geometry.x.values,
+                self.collisions_gdf.geometry.y.values,
+                self.collisions_gdf.crs, utm_crs
+            ) - self._xy_origin).astype(np.float32)
+        origin = self._xy_origin
+        coll_xy = self._collisions_xy
+        samp_xy_local = (samp_xy - origin).astype(np.float32)
+        
+        # Build the search corridor once; its bounds prune the candidates
+        search_area_projected = shapely.unary_union(
+            shapely.buffer(shapely.points(samp_xy), self.radius)
+        )
+        self.search_area = transform_geometry(
+            search_area_projected, utm_crs, self.sample_points.crs
+        )
+        min_x, min_y, max_x, max_y = \
+            np.asarray(search_area_projected.bounds) - np.tile(origin, 2)
+        # Collisions with missing lat/lon project to NaN; cKDTree rejects them
+        candidates = np.flatnonzero(
+            np.isfinite(coll_xy).all(axis=1) &
+            (coll_xy[:, 0] >= min_x) & (coll_xy[:, 0] <= max_x) &
+            (coll_xy[:, 1] >= min_y) & (coll_xy[:, 1] <= max_y)
+        )
+        
+        # Find collisions within radius using a KD-tree over candidate XY
+        tree = cKDTree(coll_xy[candidates])
+        idx_lists = tree.query_ball_point(samp_xy_local, r=self.radius, workers=-1)
+        
+        # Mark hits in a boolean mask over candidates instead of np.unique
+        mask = np.zeros(len(candidates), dtype=bool)
+        mask[np.fromiter(chain.from_iterable(idx_lists), dtype=np.intp)] = True
+        nearby_indices = candidates[mask]
+        
+        # Upcast the cached float32 offsets back to float64 coordinates
+        nearby_xy = coll_xy[nearby_indices].astype(np.float64) + origin
+        
+        # Calculate distance from each nearby collision to road
+        if _point_polyline_distance is not None and road_projected.geom_type == 'LineString':
+            verts = np.asarray(road_projected.coords, dtype=np.float64)[:, :2]
+            distances_to_road = _point_polyline_distance(nearby_xy, verts)
+        else:
+            distances_to_road = shapely.distance(
+                shapely.points(nearby_xy), road_projected
+            )
+        
+        self.nearby_collisions = self.collisions_gdf.iloc[nearby_indices].copy()
         self.nearby_collisions['distance_to_road_m'] = distances_to_road
         
         # Add mapped columns
@@ -114,16 +234,31 @@ class CollisionAnalyzer:
     
     def _add_mapped_columns(self):
         """Add human-readable mapped columns to collision data."""
-        self.nearby_collisions['severity_name'] = \
-            self.nearby_collisions['collision_severity'].map(self.SEVERITY_MAP)
-        self.nearby_collisions['day_name'] = \
-            self.nearby_collisions['day_of_week'].map(self.DAY_MAP)
-        self.nearby_collisions['weather_name'] = \
-            self.nearby_collisions['weather_conditions'].map(self.WEATHER_MAP)
-        self.nearby_collisions['light_name'] = \
-            self.nearby_collisions['light_conditions'].map(self.LIGHT_MAP)
-        self.nearby_collisions['hour'] = \
-            self.nearby_collisions['time'].str.split(':').str[0].astype(int)
+        mapped_columns = [
+            ('collision_severity', 'severity_name', self.SEVERITY_MAP),
+            ('day_of_week', 'day_name', self.DAY_MAP),
+            ('weather_conditions', 'weather_name', self.WEATHER_MAP),
+            ('light_conditions', 'light_name', self.LIGHT_MAP)
+        ]
+        
+        # Categorical lookup avoids a per-row dict hash
+        for code_col, name_col, mapping in mapped_columns:
+            self.nearby_collisions[name_col] = pd.Categorical(
+                self.nearby_collisions[code_col],
+                categories=list(mapping.keys())
+            ).rename_categories(mapping)
+        
+        self.nearby_collisions['hour'] = pd.to_datetime(
+            self.nearby_collisions['time'], format='%H:%M'
+        ).dt.hour.astype(np.int8)
+        
+        # Downcast small integer counts to shrink memory (columns with
+        # missing values are left as they are)
+        for col in ['number_of_vehicles', 'number_of_casualties', 'speed_limit']:
+            if self.nearby_collisions[col].notna().all():
+                self.nearby_collisions[col] = pd.to_numeric(
+                    self.nearby_collisions[col], downcast='integer'
+                )
     
     def calculate_statistics(self) -> Dict:
         """
@@ -146,34 +281,41 @@ class CollisionAnalyzer:
             'collisions_per_sample_point': total_collisions / len(self.sample_points)
         }
         
-        # Severity breakdown
-        severity_counts = self.nearby_collisions['severity_name'].value_counts()
-        self.statistics['severity'] = {
-            severity: {
-                'count': int(count),
-                'percentage': (count / total_collisions) * 100
+        def breakdown(column: str) -> Dict:
+            # value_counts on a categorical counts its integer codes
+            counts = self.nearby_collisions[column].value_counts()
+            counts = counts[counts > 0]
+            return {
+                name: {
+                    'count': int(count),
+                    'percentage': (count / total_collisions) * 100
+                }
+                for name, count in counts.items()
             }
-            for severity, count in severity_counts.items()
-        }
+        
+        # Severity breakdown
+        self.statistics['severity'] = breakdown('severity_name')
         
         # Time analysis
         hour_counts = self.nearby_collisions['hour'].value_counts().sort_index()
         most_common_hour = self.nearby_collisions['hour'].mode()[0] if len(self.nearby_collisions) > 0 else None
         
-        time_ranges = {
-            'Night (00-06)': (0, 6),
-            'Morning Rush (07-09)': (7, 9),
-            'Midday (10-15)': (10, 15),
-            'Evening Rush (16-18)': (16, 18),
-            'Evening (19-23)': (19, 23)
-        }
+        time_ranges = [
+            'Night (00-06)',
+            'Morning Rush (07-09)',
+            'Midday (10-15)',
+            'Evening Rush (16-18)',
+            'Evening (19-23)'
+        ]
+        time_bucket_counts = pd.cut(
+            self.nearby_collisions['hour'],
+            bins=[-1, 6, 9, 15, 18, 23],
+            labels=time_ranges
+        ).value_counts(sort=False)
         
         time_distribution = {}
-        for time_range, (start, end) in time_ranges.items():
-            count = len(self.nearby_collisions[
-                (self.nearby_collisions['hour'] >= start) & 
-                (self.nearby_collisions['hour'] <= end)
-            ])
+        for time_range in time_ranges:
+            count = int(time_bucket_counts[time_range])
             time_distribution[time_range] = {
                 'count': count,
                 'percentage': (count / total_collisions) * 100 if total_collisions > 0 else 0
@@ -186,34 +328,13 @@ class CollisionAnalyzer:
         }
         
         # Day of week
-        day_counts = self.nearby_collisions['day_name'].value_counts()
-        self.statistics['day_of_week'] = {
-            day: {
-                'count': int(count),
-                'percentage': (count / total_collisions) * 100
-            }
-            for day, count in day_counts.items()
-        }
+        self.statistics['day_of_week'] = breakdown('day_name')
         
         # Weather conditions
-        weather_counts = self.nearby_collisions['weather_name'].value_counts()
-        self.statistics['weather'] = {
-            weather: {
-                'count': int(count),
-                'percentage': (count / total_collisions) * 100
-            }
-            for weather, count in weather_counts.items()
-        }
+        self.statistics['weather'] = breakdown('weather_name')
         
         # Light conditions
-        light_counts = self.nearby_collisions['light_name'].value_counts()
-        self.statistics['light'] = {
-            light: {
-                'count': int(count),
-                'percentage': (count / total_collisions) * 100
-            }
-            for light, count in light_counts.items()
-        }
+        self.statistics['light'] = breakdown('light_name')
         
         return self.statistics
     
@@ -258,7 +379,7 @@ class CollisionAnalyzer:
         Get collision data formatted for export.
         
         Returns:
-            DataFrame with selected columns for export
+            DataFrame with selected columns for export, sorted by date
         """
         if self.nearby_collisions is None:
             self.find_nearby_collisions()
@@ -270,4 +391,11 @@ class CollisionAnalyzer:
             'light_name', 'day_name', 'hour'
         ]
         
-        return self.nearby_collisions[export_cols].copy().sort_values('date')
+        # Parse dates once; the cached order is only reused for the frame
+        # (identified by its index object) it was computed from
+        index = self.nearby_collisions.index
+        if self._export_order is None or self._export_order[0] is not index:
+            dates = pd.to_datetime(self.nearby_collisions['date'], format='%d/%m/%Y')
+            self._export_order = (index, dates.values.argsort(kind='stable'))
+        
+        return self.nearby_collisions[export_cols].iloc[self._export_order[1]]
@@ -5,10 +5,53 @@ Creates interactive maps with collision data visualization.
 """
 
 import folium
+import numpy as np
+import pandas as pd
+import shapely.geometry
+from shapely.geometry.base import BaseGeometry
 import geopandas as gpd
+from branca.element import MacroElement
+from jinja2 import Template
 from typing import List, Tuple, Optional
 
 
+class CollisionLegend(MacroElement):
+    """
+    Severity legend rendered into the map's HTML from a cached template.
+    
+    Attributes:
+        total_collisions (int): Number of collisions shown on the map
+    """
+    
+    _template = Template("""
+        {% macro html(this, kwargs) %}
+        <div style="position: fixed; 
+             bottom: 50px; right: 50px; width: 220px; height: 160px; 
+             background-color: white; border:2px solid grey; z-index:9999; 
+             font-size:14px; padding: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">
+             <p style="margin: 0 0 10px 0; font-weight: bold; font-size: 15px;">Collision Severity</p>
+             <p style="margin: 5px 0;"><span style="color: black; font-size: 18px;">●</span> Fatal</p>
+             <p style="margin: 5px 0;"><span style="color: red; font-size: 18px;">●</span> Serious</p>
+             <p style="margin: 5px 0;"><span style="color: orange; font-size: 18px;">●</span> Slight</p>
+             <hr style="margin: 10px 0; border: 1px solid #ddd;">
+             <p style="margin: 5px 0;"><span style="color: lightblue; font-size: 14px;">●</span> Sample Points</p>
+             <p style="margin: 5px 0; font-size: 11px; color: #666;">Total: {{ this.total_collisions }} collisions</p>
+        </div>
+        {% endmacro %}
+    """)
+    
+    def __init__(self, total_collisions: int):
+        """
+        Initialize CollisionLegend.
+        
+        Args:
+            total_collisions: Number of collisions shown on the map
+        """
+        super().__init__()
+        self._name = 'CollisionLegend'
+        self.total_collisions = total_collisions
+
+
 class MapVisualizer:
     """
     Create interactive Folium maps with collision data.
@@ -17,6 +60,7 @@ class MapVisualizer:
         road_coords (List[Tuple[float, float]]): Road coordinates
         sample_points (gpd.GeoDataFrame): Sample points along road
         collisions (gpd.GeoDataFrame): Collision data to visualize
+        search_area (Polygon): Optional search corridor around the road
         map_object (folium.Map): The Folium map object
     """
     
@@ -26,10 +70,25 @@ class MapVisualizer:
         'Slight': 'orange'
     }
     
+    # (property, label) pairs shown in the collision popup table
+    POPUP_FIELDS = [
+        ('collision_index', 'Collision Index:'),
+        ('date_time', 'Date:'),
+        ('location', 'Location:'),
+        ('distance', 'Distance from road:'),
+        ('severity', 'Severity:'),
+        ('number_of_vehicles', 'Vehicles involved:'),
+        ('number_of_casualties', 'Casualties:'),
+        ('speed_limit', 'Speed limit:'),
+        ('weather_name', 'Weather:'),
+        ('light_name', 'Light:')
+    ]
+    
     def __init__(self, road_coords: List[Tuple[float, float]],
                  sample_points: gpd.GeoDataFrame,
                  collisions: gpd.GeoDataFrame,
-                 zoom_start: int = 15):
+                 zoom_start: int = 15,
+                 search_area: Optional[BaseGeometry] = None):
         """
         Initialize MapVisualizer.
         
@@ -38,11 +97,15 @@ class MapVisualizer:
             sample_points: GeoDataFrame of sample points
             collisions: GeoDataFrame of collision data
             zoom_start: Initial zoom level for the map
+            search_area: Search corridor polygon in lat/lon (e.g. the
+                analyzer's search_area); drawn on the map if provided
         """
         self.road_coords = road_coords
+        self._coords_arr = np.asarray(road_coords, dtype=np.float64)
         self.sample_points = sample_points
         self.collisions = collisions
         self.zoom_start = zoom_start
+        self.search_area = search_area
         self.map_object = None
     
     def create_base_map(self) -> folium.Map:
@@ -53,8 +116,7 @@ class MapVisualizer:
             Folium Map object
         """
         # Calculate center of road
-        center_lat = sum([c[1] for c in self.road_coords]) / len(self.road_coords)
-        center_lon = sum([c[0] for c in self.road_coords]) / len(self.road_coords)
+        center_lon, center_lat = self._coords_arr.mean(axis=0)
         
         self.map_object = folium.Map(
             location=[center_lat, center_lon],
@@ -78,13 +140,40 @@ class MapVisualizer:
             self.create_base_map()
         
         folium.PolyLine(
-            locations=[(lat, lon) for lon, lat in self.road_coords],
+            locations=self._coords_arr[:, [1, 0]].tolist(),
             color=color,
             weight=weight,
             opacity=opacity,
             tooltip="Road"
         ).add_to(self.map_object)
     
+    def add_search_area(self, color: str = "blue",
+                        opacity: float = 0.1):
+        """
+        Add the collision search corridor to the map.
+        
+        Args:
+            color: Corridor outline and fill color
+            opacity: Corridor fill opacity
+        """
+        if self.map_object is None:
+            self.create_base_map()
+        
+        if self.search_area is None:
+            return
+        
+        folium.GeoJson(
+            shapely.geometry.mapping(self.search_area),
+            name="Search area",
+            style_function=lambda feature: {
+                'color': color,
+                'weight': 1,
+                'fillColor': color,
+                'fillOpacity': opacity
+            },
+            tooltip="Search area"
+        ).add_to(self.map_object)
+    
     def add_sample_points(self, radius: int = 3,
                           color: str = "lightblue",
                           opacity: float = 0.4):
@@ -99,9 +188,11 @@ class MapVisualizer:
         if self.map_object is None:
             self.create_base_map()
         
-        for i, point in enumerate(self.sample_points.geometry):
+        xs = self.sample_points.geometry.x
+        ys = self.sample_points.geometry.y
+        for i, (x, y) in enumerate(zip(xs, ys)):
             folium.CircleMarker(
-                location=[point.y, point.x],
+                location=[y, x],
                 radius=radius,
                 color=color,
                 fill=True,
@@ -111,77 +202,100 @@ class MapVisualizer:
             ).add_to(self.map_object)
     
     def add_collision_markers(self):
-        """Add collision markers with detailed popups to the map."""
+        """
+        Add collision markers with detailed popups to the map.
+        
+        All collisions are emitted as a single GeoJson layer, so the popup
+        table data is shipped to the browser once instead of one HTML popup
+        per marker.
+        """
         if self.map_object is None:
             self.create_base_map()
         
-        for _, row in self.collisions.iterrows():
-            # Create detailed popup HTML
-            popup_html = self._create_popup_html(row)
-            
-            # Add marker with color based on severity
-            folium.CircleMarker(
-                location=[row['latitude'], row['longitude']],
-                radius=8,
-                color=self.SEVERITY_COLORS.get(row['severity_name'], 'gray'),
-                fill=True,
-                fill_color=self.SEVERITY_COLORS.get(row['severity_name'], 'gray'),
-                fill_opacity=0.7,
-                popup=folium.Popup(popup_html, max_width=350),
-                tooltip=f"{row['severity_name']} - {row['date']}"
-            ).add_to(self.map_object)
+        if len(self.collisions) == 0:
+            return
+        
+        # Index a color palette by severity category codes; unknown
+        # severities have code -1 and pick the trailing 'gray'
+        severity = pd.Categorical(
+            self.collisions['severity_name'],
+            categories=list(self.SEVERITY_COLORS)
+        )
+        palette = np.array(list(self.SEVERITY_COLORS.values()) + ['gray'], dtype=object)
+        colors = pd.Series(palette[severity.codes], index=self.collisions.index)
+        
+        features = gpd.GeoDataFrame(
+            self._create_popup_fields(colors),
+            geometry=gpd.points_from_xy(
+                self.collisions['longitude'], self.collisions['latitude']
+            ),
+            crs="EPSG:4326"
+        )
+        
+        fields = [field for field, _ in self.POPUP_FIELDS]
+        aliases = [alias for _, alias in self.POPUP_FIELDS]
+        
+        # Marker color based on severity
+        folium.GeoJson(
+            features.__geo_interface__,
+            name="Collisions",
+            marker=folium.CircleMarker(radius=8, fill=True, fill_opacity=0.7),
+            style_function=lambda feature: {
+                'color': feature['properties']['color'],
+                'fillColor': feature['properties']['color']
+            },
+            tooltip=folium.GeoJsonTooltip(fields=['tooltip'], labels=False),
+            popup=folium.GeoJsonPopup(
+                fields=fields, aliases=aliases, localize=False, max_width=350
+            )
+        ).add_to(self.map_object)
     
-    def _create_popup_html(self, row) -> str:
+    def _create_popup_fields(self, colors: pd.Series) -> pd.DataFrame:
         """
-        Create HTML content for collision popup.
+        Create pre-formatted popup and tooltip properties for all collisions.
         
         Args:
-            row: DataFrame row containing collision data
+            colors: Marker color for each collision, aligned with collisions
             
         Returns:
-            HTML string for popup
-        """
-        return f"""
-        <div style="width: 320px; font-family: Arial, sans-serif;">
-            <h4 style="margin: 0 0 10px 0; color: #333; border-bottom: 2px solid #ddd; padding-bottom: 5px;">
-                Collision Details
-            </h4>
-            <table style="width: 100%; font-size: 13px; line-height: 1.6;">
-                <tr><td style="padding: 3px 5px;"><b>Collision Index:</b></td><td style="padding: 3px 5px;">{row['collision_index']}</td></tr>
-                <tr style="background-color: #f5f5f5;"><td style="padding: 3px 5px;"><b>Date:</b></td><td style="padding: 3px 5px;">{row['date']} at {row['time']}</td></tr>
-                <tr><td style="padding: 3px 5px;"><b>Location:</b></td><td style="padding: 3px 5px;">({row['latitude']:.6f}, {row['longitude']:.6f})</td></tr>
-                <tr style="background-color: #f5f5f5;"><td style="padding: 3px 5px;"><b>Distance from road:</b></td><td style="padding: 3px 5px;">{row['distance_to_road_m']:.3f} km ({row['distance_to_road_m']*1000:.0f} meters)</td></tr>
-                <tr><td style="padding: 3px 5px;"><b>Severity:</b></td><td style="padding: 3px 5px;"><span style="color: {self.SEVERITY_COLORS.get(row['severity_name'], 'gray')}; font-weight: bold;">{row['severity_name']}</span></td></tr>
-                <tr style="background-color: #f5f5f5;"><td style="padding: 3px 5px;"><b>Vehicles involved:</b></td><td style="padding: 3px 5px;">{int(row['number_of_vehicles'])}</td></tr>
-                <tr><td style="padding: 3px 5px;"><b>Casualties:</b></td><td style="padding: 3px 5px;">{int(row['number_of_casualties'])}</td></tr>
-                <tr style="background-color: #f5f5f5;"><td style="padding: 3px 5px;"><b>Speed limit:</b></td><td style="padding: 3px 5px;">{int(row['speed_limit'])} mph</td></tr>
-                <tr><td style="padding: 3px 5px;"><b>Weather:</b></td><td style="padding: 3px 5px;">{row['weather_name']}</td></tr>
-                <tr style="background-color: #f5f5f5;"><td style="padding: 3px 5px;"><b>Light:</b></td><td style="padding: 3px 5px;">{row['light_name']}</td></tr>
-            </table>
-        </div>
+            DataFrame of string columns, one per POPUP_FIELDS entry plus
+            'color' and 'tooltip'
         """
+        # map(str) keeps unmapped names as 'nan'; astype(str) would leave NaN
+        c = self.collisions
+        colors = colors.astype(str)
+        severity_name = c['severity_name'].astype(object).map(str)
+        date = c['date'].map(str)
+        distance = c['distance_to_road_m']
+        
+        return pd.DataFrame({
+            'collision_index': c['collision_index'].map(str),
+            'date_time': date + ' at ' + c['time'].map(str),
+            'location': '(' + c['latitude'].map('{:.6f}'.format) + ', '
+                        + c['longitude'].map('{:.6f}'.format) + ')',
+            'distance': distance.map('{:.3f}'.format) + ' km ('
+                        + (distance * 1000).map('{:.0f}'.format) + ' meters)',
+            'severity': '<span style="color: ' + colors
+                        + '; font-weight: bold;">' + severity_name + '</span>',
+            'number_of_vehicles': c['number_of_vehicles'].astype(int).astype(str),
+            'number_of_casualties': c['number_of_casualties'].astype(int).astype(str),
+            'speed_limit': c['speed_limit'].astype(int).astype(str) + ' mph',
+            'weather_name': c['weather_name'].astype(object).map(str),
+            'light_name': c['light_name'].astype(object).map(str),
+            'color': colors,
+            'tooltip': severity_name + ' - ' + date
+        }, index=c.index)
     
     def add_legend(self):
-        """Add a legend to the map."""
+        """Add a legend to the map (once per map)."""
         if self.map_object is None:
             self.create_base_map()
         
-        legend_html = f"""
-        <div style="position: fixed; 
-             bottom: 50px; right: 50px; width: 220px; height: 160px; 
-             background-color: white; border:2px solid grey; z-index:9999; 
-             font-size:14px; padding: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">
-             <p style="margin: 0 0 10px 0; font-weight: bold; font-size: 15px;">Collision Severity</p>
-             <p style="margin: 5px 0;"><span style="color: black; font-size: 18px;">●</span> Fatal</p>
-             <p style="margin: 5px 0;"><span style="color: red; font-size: 18px;">●</span> Serious</p>
-             <p style="margin: 5px 0;"><span style="color: orange; font-size: 18px;">●</span> Slight</p>
-             <hr style="margin: 10px 0; border: 1px solid #ddd;">
-             <p style="margin: 5px 0;"><span style="color: lightblue; font-size: 14px;">●</span> Sample Points</p>
-             <p style="margin: 5px 0; font-size: 11px; color: #666;">Total: {len(self.collisions)} collisions</p>
-        </div>
-        """
+        if any(isinstance(child, CollisionLegend)
+               for child in self.map_object._children.values()):
+            return
         
-        self.map_object.get_root().html.add_child(folium.Element(legend_html))
+        CollisionLegend(self.collisions.shape[0]).add_to(self.map_object)
     
     def build_map(self) -> folium.Map:
         """
@@ -191,6 +305,7 @@ class MapVisualizer:
             Complete Folium Map object
         """
         self.create_base_map()
+        self.add_search_area()
         self.add_road_line()
         self.add_sample_points()
         self.add_collision_markers()
@@ -4,9 +4,13 @@ Road Sampler Module
 Handles GPS coordinate sampling along road segments.
 """
 
+import numpy as np
 import geopandas as gpd
-from shapely.geometry import LineString, MultiLineString
+import shapely
+from shapely.geometry import LineString
 from shapely.ops import linemerge
+
+from .utils import transform_geometry, transform_xy
 from typing import List, Tuple, Optional, Union
 
 
@@ -114,14 +118,19 @@ class RoadSampler:
         if not linestrings:
             raise ValueError("No LineString geometries found in the road data")
         
-        # Create MultiLineString and merge
-        multi_line = MultiLineString(linestrings)
-        road_line = linemerge(multi_line)
+        # A single segment needs no merging
+        if len(linestrings) == 1:
+            self.road_line = linestrings[0]
+            return self.road_line
+        
+        # linemerge accepts the list directly; no MultiLineString needed
+        road_line = linemerge(linestrings)
         
         # Handle disconnected segments
         if road_line.geom_type == 'MultiLineString':
             print("Warning: Road consists of multiple disconnected segments")
-            road_line = max(road_line.geoms, key=lambda x: x.length)
+            parts = shapely.get_parts(road_line)
+            road_line = parts[int(np.argmax(shapely.length(parts)))]
             print(f"Working with longest segment")
         
         self.road_line = road_line
@@ -155,10 +164,11 @@ class RoadSampler:
         if self.road_gdf is None:
             self.road_gdf = gpd.GeoDataFrame(geometry=[self.road_line], crs=self.crs)
         
-        self.road_projected_gdf = self.road_gdf.to_crs(
-            self.road_gdf.estimate_utm_crs()
+        utm_crs = self.road_gdf.estimate_utm_crs()
+        self.road_projected = transform_geometry(self.road_line, self.crs, utm_crs)
+        self.road_projected_gdf = gpd.GeoDataFrame(
+            geometry=[self.road_projected], crs=utm_crs
         )
-        self.road_projected = self.road_projected_gdf.geometry.iloc[0]
         return self.road_projected_gdf
     
     def generate_sample_points(self) -> gpd.GeoDataFrame:
@@ -171,18 +181,20 @@ class RoadSampler:
         if self.road_projected is None:
             self.project_road()
         
-        # Generate sample points
-        points = [
-            self.road_projected.interpolate(d) 
-            for d in range(0, int(self.road_projected.length), self.distance_interval)
-        ]
+        # Generate sample points in one vectorized GEOS call
+        distances = np.arange(
+            0, int(self.road_projected.length), self.distance_interval
+        )
+        points = shapely.line_interpolate_point(self.road_projected, distances)
         
         # Convert back to lat/lon
-        points_gdf = gpd.GeoDataFrame(
-            geometry=points, 
-            crs=self.road_projected_gdf.crs
+        lonlat = transform_xy(
+            shapely.get_x(points), shapely.get_y(points),
+            self.road_projected_gdf.crs, self.crs
+        )
+        self.sample_points = gpd.GeoDataFrame(
+            geometry=gpd.points_from_xy(lonlat[:, 0], lonlat[:, 1], crs=self.crs)
         )
-        self.sample_points = points_gdf.to_crs(self.crs)
         
         return self.sample_points
     
@@ -6,6 +6,9 @@ Helper functions for data loading and processing.
 
 import pandas as pd
 import geopandas as gpd
+import shapely
+from functools import lru_cache
+from pyproj import Transformer
 from typing import Optional
 import numpy as np
 
@@ -43,6 +46,55 @@ def load_collision_data(filepath: str,
     return gdf
 
 
+@lru_cache(maxsize=None)
+def get_transformer(crs_from, crs_to) -> Transformer:
+    """
+    Get a cached pyproj Transformer between two coordinate reference systems.
+    
+    Args:
+        crs_from: Source CRS
+        crs_to: Target CRS
+        
+    Returns:
+        Transformer using (x, y) / (lon, lat) axis order
+    """
+    return Transformer.from_crs(crs_from, crs_to, always_xy=True)
+
+
+def transform_xy(x: np.ndarray, y: np.ndarray, crs_from, crs_to) -> np.ndarray:
+    """
+    Transform coordinate arrays between coordinate reference systems.
+    
+    Args:
+        x: Array of x (longitude) coordinates
+        y: Array of y (latitude) coordinates
+        crs_from: Source CRS
+        crs_to: Target CRS
+        
+    Returns:
+        (N, 2) array of transformed coordinates
+    """
+    fx, fy = get_transformer(crs_from, crs_to).transform(x, y)
+    return np.column_stack([fx, fy])
+
+
+def transform_geometry(geom, crs_from, crs_to):
+    """
+    Transform a Shapely geometry between coordinate reference systems.
+    
+    Args:
+        geom: Shapely geometry
+        crs_from: Source CRS
+        crs_to: Target CRS
+        
+    Returns:
+        Transformed Shapely geometry
+    """
+    return shapely.transform(
+        geom, lambda xy: transform_xy(xy[:, 0], xy[:, 1], crs_from, crs_to)
+    )
+
+
 def filter_collisions(collisions_gdf: gpd.GeoDataFrame,
                      bounds: Optional[tuple] = None,
                      date_range: Optional[tuple] = None,